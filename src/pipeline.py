@@ -1,105 +1,616 @@
 # This is where the PDF files get text extracted -> Parsed Metadata -> Stored in SQLite -> and Logged
 
+import mmap
+import multiprocessing
 import os
+import pickle
+import re
 import sqlite3
+import tempfile
 from pypdf import PdfReader
+import pypdfium2 as pdfium
 import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple
 import numpy as np # Array operations for embedding
+import zstandard as zstd
 from sentence_transformers import SentenceTransformer 
+import torch
 import faiss
 
+# Optional - fastest PDF text extraction (MuPDF), PDFium/pypdf are used when it isn't installed
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+# Optional - C Aho-Corasick matcher for section headers, a regex is used when it isn't installed
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 # Global embedding model - only loads once and can be used everywhere
 EMBEDDING_MODEL = None
 
+# Set EMBEDDING_BACKEND=onnx to embed with an int8 quantized ONNX model on CPU instead of PyTorch
+EMBEDDING_BACKEND = os.environ.get('EMBEDDING_BACKEND', 'torch').lower()
+ONNX_MODEL_DIR = os.environ.get('ONNX_MODEL_DIR', 'models/all-MiniLM-L6-v2-int8')
+ONNX_SOURCE_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+ONNX_MAX_LENGTH = 256 # Same truncation length SentenceTransformer uses for all-MiniLM-L6-v2
+
 def get_embedding_model():
     """
     Get or create the embedding model (singleton pattern)
     
     Returns:
-        SentenceTransformer model
+        SentenceTransformer model (or OnnxEmbeddingModel when EMBEDDING_BACKEND=onnx)
     """
     global EMBEDDING_MODEL
     if EMBEDDING_MODEL is None:
-        EMBEDDING_MODEL = SentenceTransformer('all-MiniLM-L6-v2')
+        if EMBEDDING_BACKEND == 'onnx':
+            EMBEDDING_MODEL = OnnxEmbeddingModel(ONNX_MODEL_DIR)
+        else:
+            # Match PyTorch's thread pool to the machine - the default can be far off and oversubscribe cores
+            torch.set_num_threads(os.cpu_count() or 4)
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                pass # Can only be set before PyTorch runs any parallel work
+
+            # Run on the GPU when there is one
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+            EMBEDDING_MODEL = SentenceTransformer('all-MiniLM-L6-v2', device=device)
+
+            # Half precision halves memory traffic and uses tensor cores on GPU, CPU stays in float32
+            if device == 'cuda':
+                EMBEDDING_MODEL.half()
+
+            # Fast (Rust) tokenizer is the default in transformers 4+, the Python one is much slower
+            if not getattr(EMBEDDING_MODEL.tokenizer, 'is_fast', True):
+                print("Warning: embedding model is using the slow Python tokenizer")
     return EMBEDDING_MODEL
 
 # This call loads the model in 2-3 seconds then can get used instanly by other functions
+
+
+# Export all-MiniLM-L6-v2 to ONNX and quantize it to int8 (only runs once, result is cached on disk)
+def export_quantized_onnx_model(model_dir: str):
+    """
+    Args:
+        model_dir: Folder to save the tokenizer and model_quantized.onnx into
+    """
+
+    # Optional dependency - only needed for the ONNX backend
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    model = ORTModelForFeatureExtraction.from_pretrained(ONNX_SOURCE_MODEL, export=True, provider='CPUExecutionProvider')
+    tokenizer = AutoTokenizer.from_pretrained(ONNX_SOURCE_MODEL)
+
+    model.save_pretrained(model_dir)
+    tokenizer.save_pretrained(model_dir)
+
+    # Dynamic quantization - weights stored as int8, activations quantized on the fly (no calibration data needed)
+    quantizer = ORTQuantizer.from_pretrained(model)
+    quantization_config = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    quantizer.quantize(save_dir=model_dir, quantization_config=quantization_config)
+
+
+# Int8 ONNX version of all-MiniLM-L6-v2 with the same encode() interface as SentenceTransformer
+class OnnxEmbeddingModel:
+
+    def __init__(self, model_dir: str):
+        """
+        Args:
+            model_dir: Folder with the quantized model (exported on first use if missing)
+        """
+
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        if not os.path.exists(os.path.join(model_dir, 'model_quantized.onnx')):
+            export_quantized_onnx_model(model_dir)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir) # Fast (Rust) tokenizer by default
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir,
+            file_name='model_quantized.onnx',
+            provider='CPUExecutionProvider'
+        )
+
+    def encode(self, texts: list, batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False, show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Args:
+            texts: List of text strings to embed
+            batch_size: Texts per ONNX run
+            convert_to_numpy: Kept for SentenceTransformer compatibility (always returns numpy)
+            normalize_embeddings: Scale each vector to length 1
+            show_progress_bar: Kept for SentenceTransformer compatibility
+
+        Returns:
+            numpy array of shape (len(texts), 384)
+        """
+
+        batches = []
+
+        for start in range(0, len(texts), batch_size):
+            # Pad only to the longest text in this batch
+            tokens = self.tokenizer(
+                texts[start:start + batch_size],
+                padding='longest',
+                truncation=True,
+                max_length=ONNX_MAX_LENGTH,
+                return_tensors='np'
+            )
+
+            token_embeddings = self.model(**tokens).last_hidden_state
+
+            # Mean pooling - average token vectors, ignoring padding
+            mask = tokens['attention_mask'][..., None].astype('float32')
+            summed = (token_embeddings * mask).sum(axis=1)
+            counts = np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(summed / counts)
+
+        embeddings = np.concatenate(batches).astype('float32', copy=False) if batches else np.zeros((0, 384), dtype='float32')
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+
+        return embeddings
+
+
+# Texts per model.encode batch
+EMBEDDING_BATCH_SIZE_CPU = 32
+EMBEDDING_BATCH_SIZE_GPU = 256
+
+# Papers buffered per database transaction in process_all_pdfs
+INSERT_BATCH_SIZE = 64
+
+# Worker processes extracting PDFs - gains flatten past ~4 as disk reads and memory bandwidth take over
+EXTRACT_WORKERS = min(os.cpu_count() or 1, 4)
+
+# FAISS index settings
+HNSW_M = 32                   # Neighbours per node in the HNSW graph
+HNSW_EF_CONSTRUCTION = 80     # Candidates checked while building the graph
+HNSW_EF_SEARCH = 32           # Candidates checked per query (quality/speed knob)
+IVFPQ_MIN_VECTORS = 100_000   # Switch to IVF-PQ above this many chunks
+RERANK_FACTOR = 4             # Candidates fetched per result when re-ranking
+IVF_NLIST = 256               # Number of clusters for IVF-PQ
+IVF_NPROBE = 16               # Clusters scanned per query
+PQ_M = 32                     # Sub-vectors per compressed code (must divide 384)
+PQ_NBITS = 8                  # Bits per sub-vector code
     
 
+# Open a connection the way the pipeline uses it
+def _open_conn(db_path: str) -> sqlite3.Connection:
+    """
+    Args:
+        db_path: Path to SQLite database
+
+    Returns:
+        sqlite3.Connection with WAL journaling, tuned PRAGMAs and dict-style rows
+    """
+
+    # check_same_thread=False so one long-lived connection can be shared by the pipeline
+    # isolation_level=None - no hidden BEGIN before inserts, writes open their transaction with _transaction
+    con = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+
+    # WAL + synchronous=NORMAL - commits append to a log instead of rewriting pages and fsync less often
+    # WAL also lets readers keep reading while a write is in progress
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+
+    # Negative cache_size is in KiB -> 64 MiB page cache instead of the 2 MiB default
+    con.execute("PRAGMA cache_size=-65536")
+
+    # Temp tables and indexes built for sorting stay in RAM
+    con.execute("PRAGMA temp_store=MEMORY")
+
+    # Read the database file through a 256 MiB memory map instead of read() calls
+    con.execute("PRAGMA mmap_size=268435456")
+
+    # Set row_factory to enable dictionary access
+    con.row_factory = sqlite3.Row
+
+    # Without this rows are returned as Tuples and accessed by index which is difficult to navigate
+    # With row_factory they are referred to as objects, accessed by column name
+
+    return con
+
+
+# Use the caller's connection, or open one just for this call
+@contextmanager
+def _connection(db_path: str, con: sqlite3.Connection = None):
+    if con is not None:
+        # Caller owns it - don't close
+        yield con
+        return
+
+    con = _open_conn(db_path)
+
+    try:
+        yield con
+    finally:
+        # Opened here so close here
+        con.close()
+
+
+# Run a block of writes as one transaction
+@contextmanager
+def _transaction(con: sqlite3.Connection):
+    # A caller's default-mode connection may already have an implicit transaction open - finish that one instead
+    if con.in_transaction:
+        with con:
+            yield con
+        return
+
+    # IMMEDIATE takes the write lock up front instead of upgrading from a read lock part way through
+    con.execute("BEGIN IMMEDIATE")
+
+    try:
+        yield con
+    except BaseException:
+        # Nothing from the block is kept
+        con.execute("ROLLBACK")
+        raise
+
+    con.execute("COMMIT")
+
+
+# Upgrade a documents table created by an older version of the pipeline
+def _migrate_documents(con: sqlite3.Connection, db_path: str):
+    """
+    Args:
+        con: Open connection, already inside a transaction
+        db_path: Path to SQLite database (text files are written next to it)
+    """
+
+    columns = {row[1] for row in con.execute("PRAGMA table_info(documents)")}
+
+    # Databases made before these columns existed get them added (NULL until filled below or the paper is re-processed)
+    for column, column_type in (('text_path', 'TEXT'), ('text_length', 'INTEGER'), ('mtime', 'REAL')):
+        if column not in columns:
+            con.execute(f"ALTER TABLE documents ADD COLUMN {column} {column_type}")
+
+    # The first schema kept each paper's text in a full_text column - move it out to compressed files
+    if 'full_text' in columns:
+        # Oldest first, so when a filename appears twice its file ends up with the newest row's text
+        paper_ids = [row[0] for row in con.execute(
+            "SELECT id FROM documents WHERE full_text IS NOT NULL ORDER BY id"
+        ).fetchall()]
+
+        for paper_id in paper_ids:
+            # One row at a time so the texts aren't all in memory together
+            filename, full_text = con.execute(
+                "SELECT filename, full_text FROM documents WHERE id = ?", (paper_id,)
+            ).fetchone()
+
+            con.execute(
+                "UPDATE documents SET text_path = ?, text_length = ? WHERE id = ?",
+                (save_text(db_path, filename, full_text), len(full_text), paper_id)
+            )
+
+        # Drop the old column (needs SQLite 3.35+), otherwise just empty it so the space can be reused
+        try:
+            con.execute("ALTER TABLE documents DROP COLUMN full_text")
+        except sqlite3.OperationalError:
+            con.execute("UPDATE documents SET full_text = NULL")
+
+        print(f"Moved full text of {len(paper_ids)} papers out of {db_path} into {_text_dir(db_path)}")
+
+    # The unique filename index can't be built while a filename appears twice (older databases allowed it)
+    # Keep the newest row per filename - its text is the one in the filename-keyed text file
+    has_filename_index = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_documents_filename'"
+    ).fetchone()
+
+    if not has_filename_index:
+        duplicates = con.execute('''SELECT id, filename FROM documents
+                                 WHERE id NOT IN (SELECT MAX(id) FROM documents GROUP BY filename)''').fetchall()
+
+        if duplicates:
+            con.executemany("DELETE FROM documents WHERE id = ?", [(row[0],) for row in duplicates])
+
+            print(f"Removed {len(duplicates)} older duplicate rows from {db_path} (kept the newest row per filename):")
+            for paper_id, filename in duplicates:
+                print(f"  id {paper_id}: {filename}")
+
+
 # Create the documents table if it doesn't exist
-def create_database(db_path: str):
+def create_database(db_path: str, con: sqlite3.Connection = None):
     '''
     
     Args:
         db_path: Path to SQLite database file (e.g., 'data/documents.db')
+        con: Optional open connection to reuse (see _open_conn)
     '''
 
-    con = sqlite3.connect(db_path) # creates/connects to database
-    cur = con.cursor() # allows command execution in db
-
-    cur.execute('''CREATE TABLE IF NOT EXISTS documents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                filename TEXT NOT NULL,
-                title TEXT,
-                authors TEXT,
-                abstract TEXT,
-                full_text TEXT,
-                page_count INTEGER,
-                file_size INTEGER,
-                processed_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT
-                )''')
-    con.commit() # save changes to database
-    con.close() # closes connection
+    # creates/connects to database, and all schema changes commit together
+    with _connection(db_path, con) as con, _transaction(con):
+        cur = con.cursor() # allows command execution in db
+
+        cur.execute('''CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    filename TEXT NOT NULL,
+                    title TEXT,
+                    authors TEXT,
+                    abstract TEXT,
+                    text_path TEXT,
+                    text_length INTEGER,
+                    page_count INTEGER,
+                    file_size INTEGER,
+                    mtime REAL,
+                    processed_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    status TEXT
+                    )''')
+
+        # Bring databases made with an older schema up to date
+        _migrate_documents(con, db_path)
+
+        # B-tree indexes so filename/status lookups don't scan the whole table
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_filename ON documents(filename)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_documents_status ON documents(status)")
 
 # INTEGER PRIMARY KEY AUTOINCREMENT: Auto-generates unique ID for each paper
 # TEXT: Stores strings (no length limit in SQLite)
 # TIMESTAMP DEFAULT CURRENT_TIMESTAMP: Automatically sets current date/time
 # IF NOT EXISTS: Won't error if table already exists (safe to run multiple times)
+# UNIQUE INDEX: One row per filename - re-processing a PDF updates its row (see INSERT_PAPER_SQL)
+# text_path: Full text lives in a compressed file next to the database, rows only hold its path
+# text_length: Characters in the full text - known without opening and decompressing the file
+# mtime: PDF's modification time when it was processed - with file_size tells if the file changed since
 
 
-def extract_pdf_text(pdf_path: str) -> dict: # Import PDF library
+# zstd level 3 - PDF text shrinks ~4-6x and compresses faster than the PDFs are read
+# Made once and reused, the pipeline only writes/reads text from one thread
+_ZSTD_COMPRESSOR = zstd.ZstdCompressor(level=3)
+_ZSTD_DECOMPRESSOR = zstd.ZstdDecompressor()
 
-    # Initialize with empty/default values 
-    result = {
-        'text': '',
-        'page_count': 0,
-        'success': False,
-        'error': None
-    }
+
+# Path next to the database named after its file, so two databases in one folder don't share files
+# (e.g., 'data/documents.texts' for 'data/documents.db' and suffix '.texts')
+def _db_sibling(db_path: str, suffix: str) -> str:
+    return os.path.splitext(db_path)[0] + suffix
+
+
+# Folder for a database's full text files (e.g., 'data/documents.texts' for 'data/documents.db')
+def _text_dir(db_path: str) -> str:
+    return _db_sibling(db_path, '.texts')
+
+
+# Write a paper's full text to a temporary file in the database's text folder
+def _stage_text(db_path: str, filename: str, full_text: str) -> tuple:
+    """
+    Args:
+        db_path: Path to SQLite database the paper belongs to
+        filename: PDF filename the text came from (e.g., 'paper.pdf')
+        full_text: Complete text extracted from PDF
+
+    Returns:
+        (text_path, staged_path) tuple - text_path is relative to the database folder
+        (e.g., 'documents.texts/paper.pdf.txt.zst'), staged_path is the temporary file holding the text
+        until _publish_text moves it there
+    """
+
+    text_dir = _text_dir(db_path)
+    os.makedirs(text_dir, exist_ok=True)
+
+    # Named after the PDF so it is known before the row (and its ID) exists
+    # Older rows may hold 'texts/...' paths - read_text resolves either against the database folder
+    text_path = os.path.join(os.path.basename(text_dir), f"{filename}.txt.zst")
+
+    # Unique temporary name in the same folder so _publish_text's rename is atomic
+    fd, staged_path = tempfile.mkstemp(dir=text_dir, suffix='.tmp')
+
+    with os.fdopen(fd, 'wb') as f:
+        f.write(_ZSTD_COMPRESSOR.compress(full_text.encode('utf-8')))
+
+    return text_path, staged_path
+
+
+# Move a staged text file into place, replacing any older text for the same PDF
+def _publish_text(db_path: str, text_path: str, staged_path: str):
+    os.replace(staged_path, os.path.join(os.path.dirname(db_path), text_path))
+
+
+# Write a paper's full text to disk as zstd-compressed UTF-8
+def save_text(db_path: str, filename: str, full_text: str) -> str:
+    """
+    Args:
+        db_path: Path to SQLite database the paper belongs to
+        filename: PDF filename the text came from (e.g., 'paper.pdf')
+        full_text: Complete text extracted from PDF
+
+    Returns:
+        str: text_path relative to the database folder (e.g., 'documents.texts/paper.pdf.txt.zst')
+    """
+
+    text_path, staged_path = _stage_text(db_path, filename, full_text)
+    _publish_text(db_path, text_path, staged_path)
+
+    return text_path
+
+
+# Read a full text file written by save_text
+def read_text(db_path: str, text_path: str) -> str:
+    """
+    Args:
+        db_path: Path to SQLite database the paper belongs to
+        text_path: text_path column value for the paper
+
+    Returns:
+        str: full text of the paper
+    """
+
+    with open(os.path.join(os.path.dirname(db_path), text_path), 'rb') as f:
+        return _ZSTD_DECOMPRESSOR.decompress(f.read()).decode('utf-8')
 
 
+
+# Extract text of every page with PyMuPDF (C library, fastest of the three backends)
+def _extract_pages_pymupdf(pdf_path: str) -> list:
+    """
+    Args:
+        pdf_path: Path to the PDF file
+
+    Returns:
+        list of page text strings
+    """
+
+    with pymupdf.open(pdf_path) as doc:
+        return [page.get_text("text") for page in doc]
+
+
+# Extract text of every page with PDFium (C++ library, much faster than pypdf)
+def _extract_pages_pdfium(pdf_path: str) -> list:
+    """
+    Args:
+        pdf_path: Path to the PDF file
+
+    Returns:
+        list of page text strings
+    """
+
+    # Given a path, PDFium reads the file natively - no Python-side copy of the bytes
+    pdf = pdfium.PdfDocument(pdf_path)
+
     try:
-        
+        # Page count is known up front, so size the list once and fill it by index
+        all_text = [None] * len(pdf)
+
+        for i in range(len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+
+            # PDFium ends lines with \r\n, the rest of the pipeline splits on \n
+            all_text[i] = textpage.get_text_range().replace('\r\n', '\n')
+
+            textpage.close()
+            page.close()
+
+        return all_text
+
+    finally:
+        pdf.close()
+
+
+# Extract text of every page with pypdf (pure Python, used when PDFium can't read a file)
+def _extract_pages_pypdf(pdf_path: str) -> list:
+    """
+    Args:
+        pdf_path: Path to the PDF file
+
+    Returns:
+        list of page text strings
+    """
+
+    # Memory-map the file so pypdf reads the OS page cache directly
+    # (given a path, pypdf would first copy the whole file into its own buffer)
+    with open(pdf_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+
         # Open the PDF using parameter
-        reader = PdfReader(pdf_path)
+        reader = PdfReader(mm)
 
-        # Get number of pages
-        result['page_count'] = len(reader.pages)
+        # Extract text from individual page & add to list - has to finish before the map is closed
+        return [page.extract_text() or '' for page in reader.pages] # returns strong of text from that page
 
-        # Extract all text from pages
-        all_text = []
 
-        for page in reader.pages:
-            # Extract text from individual page & add to list
-            page_text = page.extract_text() # returns strong of text from that page
-            all_text.append(page_text) # append to list all_text
+# Result of extract_pdf_text - a tuple is cheaper to build and to send back from worker processes than a dict
+class PdfResult(NamedTuple):
+    text: str           # All pages joined with blank lines
+    page_count: int
+    success: bool
+    error: str          # None on success
 
-            # Combine all text from list into single string for db
-        result['text'] = '\n\n'.join(all_text) # ''.join(list) take list and combines into one string with margin between pages
 
-        result['success'] = True
+def extract_pdf_text(pdf_path: str) -> PdfResult: # Import PDF library
+
+    try:
+
+        all_text = None
+
+        # PyMuPDF first when it's installed - if it can't read the file PDFium gets a go
+        if pymupdf is not None:
+            try:
+                all_text = _extract_pages_pymupdf(pdf_path)
+            except Exception:
+                pass
+
+        if all_text is None:
+            try:
+                all_text = _extract_pages_pdfium(pdf_path)
+
+            except FileNotFoundError:
+                raise
+
+            except Exception:
+                # PDFium couldn't open/read it - try pypdf before giving up
+                all_text = _extract_pages_pypdf(pdf_path)
 
     except FileNotFoundError:
         # If file doesn't exists
-        result['error'] = f"File not found: {pdf_path}"
+        return PdfResult('', 0, False, f"File not found: {pdf_path}")
 
     except Exception as e:
         # Catches other unexpected errors
-        result['error'] = f"Error proccessing PDF: {str(e)}"
+        return PdfResult('', 0, False, f"Error proccessing PDF: {str(e)}")
+
+    # Combine all text from list into single string for db, with number of pages
+    return PdfResult('\n\n'.join(all_text), len(all_text), True, None) # ''.join(list) take list and combines into one string with margin between pages
+
+
+# Section headers that end the abstract
+SECTION_HEADERS = frozenset({'background', 'introduction', 'methods', 'keywords', 'correspondence'})
+
+# Compiled once instead of scanning a list for every line
+# Case-sensitive on purpose - matching a lowercased line is several times faster than re.IGNORECASE
+_HEADER_RE = re.compile('|'.join(sorted(SECTION_HEADERS)))
+
+if ahocorasick is not None:
+    # One automaton finds any of the headers in a single pass over the line
+    _SECTION_AC = ahocorasick.Automaton()
+    for header in SECTION_HEADERS:
+        _SECTION_AC.add_word(header, header)
+    _SECTION_AC.make_automaton()
+
+    def _has_section_header(line: str) -> bool:
+        # Automaton holds lowercase words, so match against the lowercase line
+        return next(_SECTION_AC.iter(line.lower()), None) is not None
+else:
+    def _has_section_header(line: str) -> bool:
+        # Headers are lowercase in the pattern, so match against the lowercase line
+        return _HEADER_RE.search(line.lower()) is not None
+
+# Any character str.isdigit() accepts (so affiliation markers like ¹ ² count) - one linear pass that stops at the first digit
+def _has_digit(line: str) -> bool:
+    return any(map(str.isdigit, line))
+
+
+# Title stop marker - a digit and a * or @ anywhere on the line (either order)
+def _author_hint(line: str) -> bool:
+    # Plain substring checks first, they rule out most lines before the digit scan
+    # (a single 'digit.*[*@]' pattern would rescan to the end of the line from every digit)
+    return ('*' in line or '@' in line) and _has_digit(line)
 
-    return result
+
+# Author line - a digit and a comma or * anywhere on the line (either order)
+def _author_line(line: str) -> bool:
+    # Same linear shape as _author_hint - substring checks, then one digit search
+    return (',' in line or '*' in line) and _has_digit(line)
+
+# A non-empty line without its surrounding whitespace - same as line.strip() for each line of text.split('\n'), skipping blank ones
+_LINE_RE = re.compile(r'^[^\S\n]*(\S(?:.*\S)?)', re.MULTILINE)
+
+# Words in the first-line banners PubMed adds to downloaded papers (e.g., 'RESEARCH ARTICLE Open Access')
+PUBMED_HEADER_WORDS = frozenset({'RESEARCH', 'ARTICLE', 'ACCESS'})
 
 
 # Extract text and metadata from PDF file
@@ -122,11 +633,8 @@ def parse_metadata(full_text: str) -> dict:
         'abstract': None,
     }
 
-    # Split text into lines
-    lines = full_text.split('\n') # split('\n') breaks text at newline characters
-
-    # Remove whitespace and empty lines
-    line = [line.strip() for line in lines if line.strip()] # strip90 removes spaces/tabs from beginning and end
+    # Split text into lines, remove whitespace and empty lines - one regex pass instead of split + strip
+    lines = _LINE_RE.findall(full_text)
     
     # Debug code for locating metadata
 
@@ -134,85 +642,139 @@ def parse_metadata(full_text: str) -> dict:
     start_index = 0
 
     # Skip pubmed download headers
-    if lines and ('RESEARCH' in lines[0].upper() or 'ARTICLE' in lines[0].upper() or 'ACCESS' in lines[0].upper()):
+    # Set lookup per word of the first line - isdisjoint stops at the first hit and doesn't build a set
+    if lines and not PUBMED_HEADER_WORDS.isdisjoint(lines[0].upper().split()):
         start_index = 1
-        
-    # Collect title lines 1-3 lines before author name
-    for i in range(start_index, min(start_index + 5, len(lines))):
-        line = lines[i]
-        
-        # Stop if author line is hit
-        if any(char.isdigit() for char in line) and ('*' in line or '@' in line):
-            break
-        # Stop if line says 'Abstract'
-        if line.lower() == 'abstract':
-            break
-        if len(line) > 10:
-            title_lines.append(line)
 
-    # Combine title lines
-    metadata['title'] = ' '.join(title_lines) if title_lines else lines[0] if lines else '' # Joined together with spaces for correct formatting
+    # Title, authors and abstract are all found in one pass over the lines
+    # Each has its own state and the loop ends once all three are done
 
-    # Extract authors - look for line with numbers or special characters
-    author_lines = []
+    # Collect title lines 1-3 lines before author name (looks at 5 lines at most)
+    title_end = min(start_index + 5, len(lines))
+    title_open = True
 
-    for i, line in enumerate(lines[:20]): # Check first 20 lines
-        # Author lines usually have numbers, astericks, commas
-        if any(char.isdigit() for char in line) and (',' in line or '*' in line):
-            author_lines = [line]
-
-            if i + 1 < len(lines) and 'and' in lines[i +1].lower():
-                author_lines.append(lines[i + 1])
-            metadata['authors'] = ' '.join(author_lines)
-            break
-    
-    # Outsorced author detection idea but looks for numerical affiltions ( 1, 2, *)
-    # and patterns for seperating names
+    # Extract authors - look for line with numbers or special characters in the first 20 lines
+    author_open = True
 
     # Extract abstract - find "abstract" keyword and get text till next section
-    text_lower = full_text.lower()
+    # 0 = looking for the 'Abstract' header, 1 = collecting lines, 2 = hit the next section
+    abstract_state = 0
+    abstract_lines = []
 
-    # Find header
-    abstract_index = -1
     for i, line in enumerate(lines):
-        if line.lower() == 'abstract':
-            abstract_index = i
+        # Line says 'Abstract' - length check first so most lines skip the .lower() copy
+        is_abstract = len(line) == 8 and line.lower() == 'abstract'
+
+        if title_open and i >= start_index:
+            # Stop if author line is hit, or if line says 'Abstract'
+            if i >= title_end or _author_hint(line) or is_abstract:
+                title_open = False
+            elif len(line) > 10:
+                title_lines.append(line)
+
+        if author_open:
+            if i >= 20:
+                author_open = False
+
+            # Author lines usually have numbers, astericks, commas
+            elif _author_line(line):
+                author_lines = [line]
+
+                if i + 1 < len(lines) and 'and' in lines[i + 1].lower():
+                    author_lines.append(lines[i + 1])
+                metadata['authors'] = ' '.join(author_lines)
+                author_open = False
+
+        # Outsorced author detection idea but looks for numerical affiltions ( 1, 2, *)
+        # and patterns for seperating names
+
+        if abstract_state == 0:
+            # Find header
+            if is_abstract:
+                abstract_state = 1
+
+        elif abstract_state == 1:
+            # Collect lines after abstract until next section header
+            if _has_section_header(line):
+                abstract_state = 2
+
+            # Skip short lines/ possible headers
+            elif len(line) >= 20:
+                abstract_lines.append(line)
+
+        if not title_open and not author_open and abstract_state == 2:
             break
 
-    if abstract_index != -1 and abstract_index + 1 < len(lines):
-        # Collect lines after abstract until next section header
-        abstract_lines = []
+    # Combine title lines
+    metadata['title'] = ' '.join(title_lines) if title_lines else lines[0] if lines else '' # Joined together with spaces for correct formatting
 
-        section_headers = ['background', 'introduction', 'methods', 'keywords','correspondence']
+    if abstract_lines:
+        abstract_text = ' '.join(abstract_lines)
 
-        for i in range(abstract_index + 1, len(lines)):
-            line = lines[i]
-            line_lower = line.lower()
+        # Clean up
+        abstract_text = abstract_text.strip()
+        
+        # Limit length
+        if len(abstract_text) > 100:  # At least 100 chars
+            metadata['abstract'] = abstract_text[:3000]  # Max 3000 chars
 
-            # Stop at section headers
-            if any(header in line_lower for header in section_headers):
-                break
+    return metadata
 
-            # Stop at short lines/ possible headers
-            if len(line) < 20:
-                continue
+# Prepared INSERT SQL with placeholders
+INSERT_PAPER_SQL = '''INSERT INTO documents
+                (filename, title, authors, abstract, text_path, text_length, page_count, file_size, mtime, status)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                 ON CONFLICT(filename) DO UPDATE SET
+                    title = excluded.title,
+                    authors = excluded.authors,
+                    abstract = excluded.abstract,
+                    text_path = excluded.text_path,
+                    text_length = excluded.text_length,
+                    page_count = excluded.page_count,
+                    file_size = excluded.file_size,
+                    mtime = excluded.mtime,
+                    processed_date = CURRENT_TIMESTAMP,
+                    status = excluded.status'''
+
+# INSERT INTO documents table then each column is a retrieved datapoint from past functions
+# ID isn't included since its generated by the database automatically, along with timestamp
+# Placeholders prevent sql injection and sqlite will safelty insert values were a ? appears
+# ON CONFLICT: a PDF that's already in the table gets its row updated in place and keeps its ID
+
+
+# Save a paper's full text and order its values to match the INSERT_PAPER_SQL placeholders
+# Returns (row, staged_path) - the text is only published once the row is committed,
+# so a rolled back upsert can't leave the old row pointing at new text
+def _paper_row(db_path: str, paper_data: dict) -> tuple:
+    text_path, staged_path = _stage_text(db_path, paper_data['filename'], paper_data['full_text'])
+
+    row = (
+        paper_data['filename'],
+        paper_data['title'],
+        paper_data['authors'],
+        paper_data['abstract'],
+        text_path,
+        len(paper_data['full_text']),
+        paper_data['page_count'],
+        paper_data['file_size'],
+        paper_data.get('mtime'),
+        paper_data['status']
+    )
 
-            abstract_lines.append(line)
+    return row, staged_path
 
-        if abstract_lines:
-            abstract_text = ' '.join(abstract_lines)
 
-            # Clean up
-            abstract_text = abstract_text.strip()
-            
-            # Limit length
-            if len(abstract_text) > 100:  # At least 100 chars
-                metadata['abstract'] = abstract_text[:3000]  # Max 3000 chars
+# Publish the staged text files of committed rows, or delete them when the transaction failed
+def _finish_texts(db_path: str, staged: list, committed: bool):
+    for paper_row, staged_path in staged:
+        if committed:
+            _publish_text(db_path, paper_row[4], staged_path)
+        else:
+            os.remove(staged_path)
 
-    return metadata
 
 # Insert paper metadata into database
-def insert_paper(db_path: str, paper_data: dict):
+def insert_paper(db_path: str, paper_data: dict, con: sqlite3.Connection = None):
     """
     Insert paper metadata into database
     
@@ -223,84 +785,119 @@ def insert_paper(db_path: str, paper_data: dict):
             - title: str
             - authors: str
             - abstract: str or None
-            - full_text: str
+            - full_text: str (written to disk, see save_text)
             - page_count: int
             - file_size: int (in bytes)
+            - mtime: float (optional, PDF modification time)
             - status: str ('SUCCESS' or 'ERROR')
+        con: Optional open connection to reuse (see _open_conn)
     
     Returns:
-        int: ID of inserted paper
+        int: ID of inserted (or updated) paper
     """
 
     # Connect to db and create cursor 
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
+    with _connection(db_path, con) as con:
+        cur = con.cursor()
 
-    # Prepared INSERT SQL with placeholders
-    sql = '''INSERT INTO documents
-                (filename, title, authors, abstract, full_text, page_count, file_size, status)
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)'''
-    
-    # INSERT INTO documents table then each column is a retrieved datapoint from past functions
-    # ID isn't included since its generated by the database automatically, along with timestamp
-    # Placeholders prevent sql injection and sqlite will safelty insert values were a ? appears
+        staged = [_paper_row(db_path, paper_data)]
 
-    cur.execute(sql, (
-        paper_data['filename'],
-        paper_data['title'],
-        paper_data['authors'],
-        paper_data['abstract'],
-        paper_data['full_text'],
-        paper_data['page_count'],
-        paper_data['file_size'],
-        paper_data['status']
-    ))
-    
-    # Execute takes two arguements - SQL statement with placeholders and tuple of values to insert
+        # Explicit transaction so the row is committed whatever isolation level the connection uses
+        try:
+            with _transaction(con):
+                cur.execute(INSERT_PAPER_SQL, staged[0][0])
+        except BaseException:
+            _finish_texts(db_path, staged, committed=False)
+            raise
 
-    # Save changes
-    con.commit()
+        _finish_texts(db_path, staged, committed=True)
+        
+        # Execute takes two arguements - SQL statement with placeholders and tuple of values to insert
 
-    # Gers ID of most recent insert
-    paper_id = cur.lastrowid
+        # lastrowid isn't set when the row already existed and was updated, so look the ID up (indexed)
+        return cur.execute("SELECT id FROM documents WHERE filename = ?", (paper_data['filename'],)).fetchone()[0]
 
-    # Close connection to database
-    con.close()
+# Insert many papers with one connection and one transaction
+def insert_papers_bulk(db_path: str, rows: list, con: sqlite3.Connection = None) -> int:
+    """
+    Args:
+        db_path: Path to SQLite database
+        rows: List of paper_data dicts (same keys as insert_paper)
+        con: Optional open connection to reuse (see _open_conn)
 
-    return paper_id
+    Returns:
+        int: number of papers inserted
+    """
 
-# Retreive all papers from database
-def get_all_papers(db_path: str) -> list:
+    # Text files are staged before the write lock is taken, and only moved into place after COMMIT
+    staged = []
+    try:
+        for paper_data in rows:
+            staged.append(_paper_row(db_path, paper_data))
 
+        with _connection(db_path, con) as con:
+            # One transaction - commits once at the end (or rolls back everything if a row fails)
+            with _transaction(con):
+                con.executemany(INSERT_PAPER_SQL, [paper_row for paper_row, _ in staged])
+    except BaseException:
+        _finish_texts(db_path, staged, committed=False)
+        raise
+
+    _finish_texts(db_path, staged, committed=True)
+
+    return len(rows)
+
+# Columns of the documents table - iter_papers only accepts these names
+PAPER_COLUMNS = ('id', 'filename', 'title', 'authors', 'abstract', 'text_path', 'text_length',
+                 'page_count', 'file_size', 'mtime', 'processed_date', 'status')
+
+# Columns worth showing when listing papers - leaves out where/how the text is stored
+META_COLUMNS = ('id', 'filename', 'title', 'authors', 'abstract',
+                'page_count', 'file_size', 'processed_date', 'status')
+
+
+# Stream papers from the database one row at a time
+def iter_papers(db_path: str, columns: tuple = None, con: sqlite3.Connection = None):
     '''
 
-    Args: 
-        db_path : Path to SQLite database
-    
-    Returns:
-        list of dicts, each one containing paper metadata
+    Args:
+        db_path: Path to SQLite database
+        columns: Columns to select (from PAPER_COLUMNS), None for all of them
+        con: Optional open connection to reuse (see _open_conn)
+
+    Yields:
+        sqlite3.Row per paper - unpacks like a tuple (pid, path = row) or index by name (row['id'])
     '''
 
-    # Connect to database
-    con = sqlite3.connect(db_path)
-    
-    # Set row_factory to enable dictionary access
-    con.row_factory = sqlite3.Row
+    if columns is None:
+        columns = PAPER_COLUMNS
 
-    # Without this rows are returned as Tuples and accessed by index which is difficult to navigate
-    # With row_factory they are referred to as objects, accessed by column name
+    # Column names can't be ? placeholders, so only known names go into the SQL
+    unknown = [col for col in columns if col not in PAPER_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown documents columns: {unknown}")
+
+    with _connection(db_path, con) as con:
+        # Iterating the cursor fetches rows as they are needed instead of all at once
+        yield from con.execute(f"SELECT {', '.join(columns)} FROM documents")
 
-    # Create cursor
-    cur = con.cursor()
 
-    # Shows every column from every row in table
-    cur.execute("SELECT * FROM documents")
+# Retreive all papers from database
+def get_all_papers(db_path: str, con: sqlite3.Connection = None) -> list:
+
+    '''
+
+    Args: 
+        db_path : Path to SQLite database
+        con: Optional open connection to reuse (see _open_conn)
     
-    # Fetch all results
-    rows = cur.fetchall() # function retreives all matching rows and returns list of row objects
+    Returns:
+        list of dicts, each one containing paper metadata (load the text with load_text/read_text)
+        Use iter_papers to go through papers without holding them all in memory
+    '''
 
     # Convert Row onjects into regular dicts
-    papers = [dict(row) for row in rows]
+    papers = [dict(row) for row in iter_papers(db_path, con=con)]
 
     # They are converted because row objects are for database while in python its easier to work with dicts broken down is ...
 
@@ -308,49 +905,73 @@ def get_all_papers(db_path: str) -> list:
     #     paper_dict = dict(row)  # Convert Row → dict
     #     papers.append(paper_dict)
 
-    # No changes made so only disconnect from database
-    con.close()
-
     return papers
 
 
+# Retreive metadata of all papers for listings (titles, authors, ...)
+def get_all_papers_meta(db_path: str, con: sqlite3.Connection = None) -> list:
+    '''
+
+    Args:
+        db_path: Path to SQLite database
+        con: Optional open connection to reuse (see _open_conn)
+
+    Returns:
+        list of dicts with the META_COLUMNS of each paper
+    '''
+
+    return [dict(row) for row in iter_papers(db_path, META_COLUMNS, con=con)]
+
+
 # Get specific paper by ID
-def get_paper_by_id(db_path: str, paper_id: int) -> dict:
+def get_paper_by_id(db_path: str, paper_id: int, con: sqlite3.Connection = None) -> dict:
 
     '''
 
     Args: 
         db_path: Path to the database
         paper_id: ID to specific paper 
+        con: Optional open connection to reuse (see _open_conn)
 
     Returns:
-        specific paper information based off provided ID
+        specific paper information based off provided ID, including full_text
     '''
     # Connect to database
-    con = sqlite3.connect(db_path)
+    with _connection(db_path, con) as con:
 
-    # Set row_factory to enable dictionary access
-    con.row_factory = sqlite3.Row
-    
-    # Create cursor
-    cur = con.cursor()
-
-    # SELECT all columns from database where ID matches input
-    cur.execute("SELECT * FROM documents WHERE id = ?", (paper_id,))
+        # SELECT all columns from database where ID matches input
+        # con.execute skips the explicit cursor, and on a reused connection the parsed statement is cached by its SQL text
+        row = con.execute("SELECT * FROM documents WHERE id = ?", (paper_id,)).fetchone()
 
-    # Instead of featching all, only getting one paper/row in database
-    row = cur.fetchone()
+        # Instead of featching all, only getting one paper/row in database
 
     # Convert if found
     if row:
         paper = dict(row)
+        paper['full_text'] = read_text(db_path, paper['text_path'])
     else:
         paper = None
 
-    con.close()
-
     return paper
 
+
+# Load one paper's full text
+def load_text(db_path: str, paper_id: int, con: sqlite3.Connection = None):
+    '''
+
+    Args:
+        db_path: Path to the database
+        paper_id: ID to specific paper
+        con: Optional open connection to reuse (see _open_conn)
+
+    Returns:
+        str full text of the paper, or None if the ID doesn't exist
+    '''
+    with _connection(db_path, con) as con:
+        row = con.execute("SELECT text_path FROM documents WHERE id = ?", (paper_id,)).fetchone()
+
+    return read_text(db_path, row[0]) if row else None
+
 # Logging functions to track pipeline actions
 
 # Configure logger with file and console output
@@ -402,6 +1023,12 @@ def setup_logger(name: str, log_file: str = None) -> logging.Logger:
 
 # RAG Implimentation - functions for retrieval, augementation and generation
 
+# Bigger batches keep a GPU busy, small ones suit CPU cache sizes
+def _embedding_batch_size(model) -> int:
+    on_gpu = str(getattr(model, 'device', 'cpu')).startswith('cuda')
+    return EMBEDDING_BATCH_SIZE_GPU if on_gpu else EMBEDDING_BATCH_SIZE_CPU
+
+
 # Convert list of text chunks into embeddings
 def create_embeddings(texts: list) -> np.ndarray:
     """
@@ -409,20 +1036,57 @@ def create_embeddings(texts: list) -> np.ndarray:
         texts: List of text strings to embed
 
     Returns:
-        numpy array of embeddings
+        numpy array of unit-length embeddings
     """
 
     # Get model from original load
     model = get_embedding_model()
 
-    # Create embeddings
-    embeddings = model.encode(texts)
+    # Sort texts by length so each minibatch holds similar sized texts
+    # The model pads every batch to its longest member, so mixed lengths waste work on padding tokens
+    order = np.argsort([len(text) for text in texts], kind='stable')
+
+    # Create embeddings in one call so the model can batch across every text
+    embeddings = model.encode(
+        [texts[i] for i in order],
+        batch_size=_embedding_batch_size(model),
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )
     # model.encoe() takes list of strings and retunrs numpy array of shape (len(texts), 384) meaning each row is a 384-dimensional vector for one text
+    # normalize_embeddings=True scales every vector to length 1 so inner product == cosine similarity
 
-    return embeddings
+    # Undo the sort so row i is still the embedding for texts[i]
+    inverse = np.argsort(order)
+
+    return embeddings[inverse]
 
     
 
+# Yield overlapping chunks one at a time
+def iter_text_chunks(text: str, chunk_size: int = 1000, overlap: int = 200):
+    """
+        Args:
+            text: Full text to chunk
+            chunk_size: Size of each chunk in characters
+            overlap: Overlap between chunks
+
+        Yields:
+            Text chunks in order, without holding them all in memory
+        """
+
+    step = chunk_size - overlap # How far to move each time
+
+    # A step of 0 or less would never reach the end of the text
+    if step <= 0:
+        raise ValueError(f"overlap ({overlap}) must be smaller than chunk_size ({chunk_size})")
+
+    # Chunk start positions are known up front: 0, 800, 1600, ... keeping 200 overlap
+    for start in range(0, len(text), step):
+        yield text[start:start + chunk_size]
+
+
 # Split text into overlapping chunks
 def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list:
     """
@@ -434,63 +1098,86 @@ def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list:
         Returns:
             List of text chunks
         """
-    
-    chunks =[]
-    start = 0
-    step = chunk_size - overlap # How far to move each time
-
-    while start < len(text):
-        # Extract chunk from start to start + chunk_size
-        end = start + chunk_size
-        chunk = text[start:end]
 
-        # Moving 800 char forward each time, keeping 200 overlap
+    return list(iter_text_chunks(text, chunk_size, overlap))
 
-        chunks.append(chunk)
+# Everything needed to search the chunks, stored column by column
+@dataclass
+class ChunkStore:
+    """
+    Row i of every array belongs to the vector with ID i in the FAISS index
+
+    Attributes:
+        paper_ids: int32 array - paper each chunk came from
+        chunk_indices: int32 array - position of the chunk within its paper
+        texts: list of chunk strings
+        index: FAISS index of the chunk embeddings
+        embeddings: float16 array of chunk vectors (used for re-ranking, half the memory of float32)
+    """
+    paper_ids: np.ndarray
+    chunk_indices: np.ndarray
+    texts: list
+    index: object
+    embeddings: np.ndarray
 
-        # Move to next position
-        start += step
+    def __len__(self) -> int:
+        return len(self.texts)
 
+# Columns instead of a list of dicts - two small int arrays cost a few bytes per chunk
+# and can be filtered with numpy, e.g. np.flatnonzero(store.paper_ids == 3)
 
-    return chunks
 
-# Build FIASS vector store from papers
-def build_vector_store(paper_texts: list) -> tuple:
+# Chunk papers and record where every chunk came from
+def chunk_papers(paper_texts: list) -> tuple:
     """
     Args:
         paper_texts: List of (paper_id, full_text) tuples
 
     Returns:
-        (faiss_index, check_metadata) tuple
-        chunk_metadata: List of dicts with {paper_id, chunk_text, chunk_index}
-    
+        (texts, paper_ids, chunk_indices) tuple
+        texts: List of chunk strings
+        paper_ids, chunk_indices: int32 arrays, one entry per chunk
     """
 
-    all_chunks = []
-    chunk_metadata = []
+    texts = []
+    paper_ids = []
+    chunk_indices = []
 
-    # Chunk all papers is step 1
     for paper_id, text in paper_texts:
-        chunks = chunk_text(text)
+        start = len(texts)
+        texts.extend(iter_text_chunks(text))
+
+        # Every chunk of this paper gets its ID and its position 0, 1, 2, ...
+        paper_ids.append(np.full(len(texts) - start, paper_id, dtype=np.int32))
+        chunk_indices.append(np.arange(len(texts) - start, dtype=np.int32))
 
-        for chunk_index, chunk_text_str in enumerate(chunks):
-            all_chunks.append(chunk_text_str)
+        # When FAISS returns index 5, paper_ids[5] and chunk_indices[5]
+        # tell us which paper and which chunk within that paper
 
-            chunk_metadata.append({
-                'paper_id': paper_id,
-                'chunk_text': chunk_text_str,
-                'chunk_index': chunk_index
-            })
+    if not texts:
+        return texts, np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
 
-            # Stored metadata for each chunk
-            # When FAISS returns index 5, we can lookup the metadata[5]
-            # To see which paper and which chunk within that paper
+    return texts, np.concatenate(paper_ids), np.concatenate(chunk_indices)
 
 
-    print(f"Created {len(all_chunks)} chunks from {len(paper_texts)} papers")
+# Build FIASS vector store from papers
+def build_vector_store(paper_texts: list) -> ChunkStore:
+    """
+    Args:
+        paper_texts: List of (paper_id, full_text) tuples
+
+    Returns:
+        ChunkStore with the FAISS index, chunk columns and chunk embeddings
+    
+    """
+
+    # Chunk all papers is step 1
+    texts, paper_ids, chunk_indices = chunk_papers(paper_texts)
+
+    print(f"Created {len(texts)} chunks from {len(paper_texts)} papers")
 
     # Create embeddings for all chunks is step 2
-    embeddings = create_embeddings(all_chunks)
+    embeddings = create_embeddings(texts)
 
     print(f"Created embeddings whip shape: {embeddings.shape}")
     # embedding.shape = (num_chunks, 384) each row is embedding for one chunk
@@ -498,67 +1185,309 @@ def build_vector_store(paper_texts: list) -> tuple:
     # Build FAISS index for step 3
     dimension = embeddings.shape[1] # 384 for all-MiniLM
 
-    index = faiss.IndexFlatL2(dimension)
+    # FAISS requires float32 - copy=False skips a second full copy of the matrix when it already is
+    embeddings_float32 = embeddings.astype('float32', copy=False)
+
+    if len(embeddings_float32) > IVFPQ_MIN_VECTORS:
+        # Very large corpus - cluster into lists and store compressed codes
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, IVF_NLIST, PQ_M, PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+
+        # IVF-PQ has to learn its clusters and codebooks before vectors can be added
+        index.train(embeddings_float32)
+    else:
+        # Vectors are stored as 8-bit codes (384 bytes instead of 1536) - a quarter of the memory to read per comparison
+        index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit_uniform, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+
+        # Normalized embeddings always lie in [-1, 1], so the quantizer is given that fixed range instead of
+        # learning it from this build's vectors - papers added later on other topics aren't clipped
+        index.train(np.array([[-1.0] * dimension, [1.0] * dimension], dtype='float32'))
 
-    # IndexFlatL2 = brute force search using L2
-    # Flat means to checks each vector which is okay with our small amount of data
+    # IndexHNSWSQ = graph of nearest neighbours, a search only walks a few hops instead of checking every vector
+    # IndexIVFPQ = only scans the closest clusters and compares compressed vectors
+    # Both use inner product - embeddings are normalized so inner product is cosine similarity (higher = more similar)
+    # Queries stay float32, and the float16 vectors in ChunkStore.embeddings re-rank the top candidates
 
-    # FAISS requires float32
-    embeddings_float32 = embeddings.astype('float32')
     index.add(embeddings_float32)
 
     # add() inserts vectors into the index with an ID
-    # the ID's correspond to postions in the chunk_metatdata list
+    # the ID's correspond to row positions in the ChunkStore columns
 
     print(f"Built FAISS index with {index.ntotal} vectors")
 
-    return index, chunk_metadata
+    # Re-rank vectors kept as float16 - 768 bytes per chunk, plus the 384 byte SQ8 code in the index,
+    # instead of 1536 bytes for a float32 copy
+    return ChunkStore(paper_ids, chunk_indices, texts, index, embeddings_float32.astype('float16'))
+
+
+# Whether new vectors can be appended to an index without re-training it
+def _can_append(index) -> bool:
+    """
+    Args:
+        index: FAISS index from build_vector_store or load_vector_store
+
+    Returns:
+        False for 8-bit indexes saved before the quantizer range was fixed - their range only covers the first build
+    """
+
+    if not isinstance(index, faiss.IndexHNSWSQ):
+        return True
+
+    return faiss.downcast_index(index.storage).sq.qtype == faiss.ScalarQuantizer.QT_8bit_uniform
+
+
+# Add new papers to an existing vector store without re-embedding the old ones
+def add_to_vector_store(store: ChunkStore, paper_texts: list) -> int:
+    """
+    Args:
+        store: ChunkStore returned by build_vector_store (updated in place)
+        paper_texts: List of (paper_id, full_text) tuples for the new papers
+
+    Returns:
+        int: number of chunks added
+    """
+
+    texts, paper_ids, chunk_indices = chunk_papers(paper_texts)
+
+    if not texts:
+        return 0
+
+    # New vectors get the next ID's so they line up with the end of the columns
+    embeddings = create_embeddings(texts).astype('float32', copy=False)
+    store.index.add(embeddings)
+
+    store.paper_ids = np.concatenate([store.paper_ids, paper_ids])
+    store.chunk_indices = np.concatenate([store.chunk_indices, chunk_indices])
+    store.texts.extend(texts)
+    store.embeddings = np.concatenate([store.embeddings, embeddings.astype('float16')])
+
+    return len(texts)
+
+
+# Save FAISS index and chunk columns to disk
+def save_vector_store(store: ChunkStore, fingerprint: dict, index_path: str, metadata_path: str):
+    """
+    Args:
+        store: ChunkStore to save
+        fingerprint: dict of {paper_id: (text length, mtime, processed_date)} the index was built from
+        index_path: Path for the FAISS index (e.g., 'data/documents.index.faiss')
+        metadata_path: Path for the pickled chunk columns (e.g., 'data/documents.index.pkl')
+    """
+
+    for path in (index_path, metadata_path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    faiss.write_index(store.index, index_path)
+
+    with open(metadata_path, 'wb') as f:
+        pickle.dump({
+            'paper_ids': store.paper_ids,
+            'chunk_indices': store.chunk_indices,
+            'texts': store.texts,
+            'embeddings': store.embeddings,
+            'fingerprint': fingerprint
+        }, f)
 
 
+# Load FAISS index and chunk columns saved by save_vector_store
+def load_vector_store(index_path: str, metadata_path: str):
+    """
+    Args:
+        index_path: Path to the FAISS index
+        metadata_path: Path to the pickled chunk columns
+
+    Returns:
+        (store, fingerprint) tuple, or None if nothing is saved
+    """
+
+    if not (os.path.exists(index_path) and os.path.exists(metadata_path)):
+        return None
+
+    faiss_index = faiss.read_index(index_path)
+
+    with open(metadata_path, 'rb') as f:
+        saved = pickle.load(f)
+
+    # Stores saved before re-rank vectors were float16 are converted on load
+    embeddings = saved['embeddings']
+    if embeddings is not None:
+        embeddings = embeddings.astype('float16', copy=False)
+
+    store = ChunkStore(saved['paper_ids'], saved['chunk_indices'], saved['texts'], faiss_index, embeddings)
+
+    return store, saved['fingerprint']
+
+
+# Embed a single question, cached so repeated questions skip the model
+@lru_cache(maxsize=1000)
+def _embed_query(question: str) -> bytes:
+    """
+    Args:
+        question: Normalized question text
+
+    Returns:
+        float32 embedding as raw bytes (immutable so it is safe to share from the cache)
+    """
+
+    model = get_embedding_model()
+
+    embedding = model.encode(
+        [question],
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )[0]
+
+    return embedding.astype('float32').tobytes()
+
+
+# Get the embedding for a question as a (1, 384) float32 array
+def embed_query(question: str) -> np.ndarray:
+    """
+    Args:
+        question: User's input
+
+    Returns:
+        numpy array of shape (1, 384)
+    """
+
+    # Collapse whitespace so "What is leptin?" and " What  is leptin? " share a cache entry
+    normalized = ' '.join(question.split())
+
+    return np.frombuffer(_embed_query(normalized), dtype='float32').reshape(1, -1)
+
 
 # Query RAG system
-def query_rag(question: str, faiss_index, chunk_metadata: list, top_k: int = 5):
+def query_rag(question: str, store: ChunkStore, top_k: int = 5):
     """
     Args:
         question: User's input
-        faiss_index: FAISS indec
-        chunk_metadata: chunk metadata
+        store: ChunkStore from build_vector_store - when it has embeddings, FAISS fetches
+               extra candidates and they are re-ranked with exact scores
         top_k: number of chunks to retrieve
 
     Returns: 
-        List of relevent chunks with metadata
+        List of relevent chunks with metadata, best match first
+        ('score' is cosine similarity, 'distance' is 1 - score)
     """
 
-    # Embed the question
-    question_embedding = create_embeddings([question])
+    # Embed the question (cached after the first time it is asked)
+    question_embedding_float32 = embed_query(question)
+
+    faiss_index = store.index
+    chunk_embeddings = store.embeddings
+
+    # Fetch extra candidates when they will be re-ranked
+    search_k = top_k * RERANK_FACTOR if chunk_embeddings is not None else top_k
 
     # Search FAISS index
-    question_embedding_float32 = question_embedding.astype('float32')
+    # Search-time quality/speed knobs - bigger values check more candidates
+    if hasattr(faiss_index, 'hnsw'):
+        faiss_index.hnsw.efSearch = max(HNSW_EF_SEARCH, search_k)
+    elif hasattr(faiss_index, 'nprobe'):
+        faiss_index.nprobe = IVF_NPROBE
 
-    distances, indices = faiss_index.search(question_embedding_float32, top_k)
+    # Inner product index - FAISS returns similarity scores, highest first
+    scores, indices = faiss_index.search(question_embedding_float32, search_k)
+
+    if chunk_embeddings is not None:
+        # Drop -1 padding, then re-score the candidates against their stored vectors
+        # Only the few candidate rows are widened back to float32 for the dot products
+        candidate_ids = indices[0][indices[0] >= 0]
+        candidates = chunk_embeddings[candidate_ids].astype('float32')
+        scores = np.dot(candidates, question_embedding_float32[0])
+
+        # Keep the best top_k (highest score first)
+        best = np.argsort(-scores)[:top_k]
+        indices = candidate_ids[best].reshape(1, -1)
+        scores = scores[best].reshape(1, -1)
+
+    top_k = indices.shape[1]
 
     # Build results
     results = []
 
     for i in range(top_k):
         chunk_id = indices[0][i] # Get chunk ID
-        distance = distances[0][i] # Get the distance
+        score = float(scores[0][i]) # Cosine similarity, converted from numpy float into python float
 
-        # Get metadata for this chunk
-        metadata = chunk_metadata[chunk_id]
+        # FAISS pads with -1 when it finds fewer than top_k chunks
+        if chunk_id < 0:
+            continue
 
+        # Look up this chunk's row in the store
         results.append({
-            'paper_id': metadata['paper_id'],
-            'chunk_text': metadata['chunk_text'],
-            'chunk_index': metadata['chunk_index'],
-            'distance': float(distance) # Converts numpy float into python float
-
+            'paper_id': int(store.paper_ids[chunk_id]),
+            'chunk_text': store.texts[chunk_id],
+            'chunk_index': int(store.chunk_indices[chunk_id]),
+            'score': score, # Higher = closer
+            'distance': 1.0 - score # Cosine distance, lower = closer (same direction as the old L2 distance)
         })
 
     return results
 
 
 
+# Extract text and metadata from one PDF without touching the database
+def _extract_and_parse(pdf_path: str, file_size: int = None, mtime: float = None) -> tuple:
+    """
+    Top level function so it can be sent to worker processes
+
+    Args:
+        pdf_path: Path to the PDF file
+        file_size: Size from the directory listing (stat'ed here when not given)
+        mtime: Modification time from the directory listing (stat'ed here when not given)
+
+    Returns:
+        (filename, result, metadata, file_size, mtime) tuple
+        metadata, file_size and mtime are None when extraction failed
+    """
+
+    filename = os.path.basename(pdf_path)
+
+    # Stat before extracting - if the file changes mid-run the stored mtime is older than the file,
+    # so the next run picks it up again instead of skipping it
+    if file_size is None or mtime is None:
+        try:
+            st = os.stat(pdf_path)
+            file_size, mtime = st.st_size, st.st_mtime
+        except OSError:
+            # extract_pdf_text reports the missing file
+            pass
+
+    result = extract_pdf_text(pdf_path)
+
+    if not result.success:
+        return filename, result, None, None, None
+
+    metadata = parse_metadata(result.text)
+
+    return filename, result, metadata, file_size, mtime
+
+
+# Check a PDF against what the documents table stored for it
+def _unchanged(stored: tuple, st: os.stat_result) -> bool:
+    """
+    Args:
+        stored: (file_size, mtime) from the documents table, or None if the PDF isn't in it
+        st: os.stat result for the PDF now
+
+    Returns:
+        True if the PDF can be skipped
+    """
+
+    if stored is None:
+        return False
+
+    file_size, mtime = stored
+
+    # Rows from before mtime was stored only have the size to go on
+    return file_size == st.st_size and (mtime is None or mtime == st.st_mtime)
+
+
 # Main pipeline for proccessing research papers
 class PaperPipeline: 
 
@@ -584,15 +1513,27 @@ class PaperPipeline:
         self.logger.info(f"Data directory: {data_dir}")
         self.logger.info(f"Database: {db_path}")
 
+        # One connection for the life of the pipeline instead of one per query
+        self._conn = _open_conn(self.db_path)
+
         # Create database if it doesn't exist
-        create_database(self.db_path)
+        create_database(self.db_path, con=self._conn)
+
+        # Papers waiting to be written by flush()
+        self._pending = []
         self.logger.info("Database Ready")
 
+        # RAG index lives next to the database, named after it, so warm starts can load it
+        self.index_path = _db_sibling(db_path, '.index.faiss')
+        self.index_metadata_path = _db_sibling(db_path, '.index.pkl')
+        self.chunk_store = None
+
         # Initialize stat tracking
         self.stats = {
             'total': 0,
             'successful': 0,
             'failed': 0,
+            'skipped': 0,
             'errors': []
         }
         
@@ -605,53 +1546,143 @@ class PaperPipeline:
 
         self.logger.info(f"Processing: {filename}")
 
-        # Extract PDF text
-        result = extract_pdf_text(pdf_path)
+        # Extract PDF text and parse metadata
+        paper_data = self._prepare_paper(*_extract_and_parse(pdf_path))
+
+        # If failure, it is already logged so return False
+        if paper_data is None:
+            return False
 
-        # If failure, log error, and return False
-        if not result['success']:
-            self.logger.error(f"Failed to extract {filename}: {result['error']}")
+        # Insert into database
+        try:
+            paper_id = insert_paper(self.db_path, paper_data, con=self._conn)
+            self.logger.info(f"Inserted {filename} with ID: {paper_id}")
+            self.stats['successful'] += 1
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Database error for {filename}: {str(e)}")
             self.stats['failed'] += 1
-            self.stats['errors'].append({'file': filename, 'error': result['error']})
+            self.stats['errors'].append({'file': filename, 'error': str(e)})
             return False
         
+    # Database inserts should be wrapped in try/except so errors don't crash the whole pipeline
+
+    # Log the output of _extract_and_parse and turn it into a database row
+    def _prepare_paper(self, filename: str, result: PdfResult, metadata: dict, file_size: int, mtime: float):
+        """
+        Returns:
+            paper_data dict ready for insert, or None if extraction failed
+        """
+
+        # If failure, log error, and return None
+        if not result.success:
+            self.logger.error(f"Failed to extract {filename}: {result.error}")
+            self.stats['failed'] += 1
+            self.stats['errors'].append({'file': filename, 'error': result.error})
+            return None
+        
         # Parse metadata with title length limit
-        metadata = parse_metadata(result['text'])
         self.logger.info(f"Parsed metadata - Title: {metadata['title'][:50]}")
 
         # Prepare paper data for database
-        paper_data = {
+        return {
             'filename': filename,
             'title': metadata['title'],
             'authors': metadata['authors'],
             'abstract': metadata['abstract'],
-            'full_text': result['text'],
-            'page_count': result['page_count'],
-            'file_size': os.path.getsize(pdf_path),
+            'full_text': result.text,
+            'page_count': result.page_count,
+            'file_size': file_size,
+            'mtime': mtime,
             'status': 'SUCCESS'
         }
 
-        # Insert into database
+    # Buffer a paper for the next batched insert
+    def queue_paper(self, paper_data: dict):
+        """
+        Args:
+            paper_data: dict with the keys insert_paper takes
+
+        Writes the buffer with flush() once INSERT_BATCH_SIZE papers are waiting.
+        Call flush() (or close()) to write a last partial batch.
+        """
+
+        self._pending.append(paper_data)
+
+        # Commit in batches so one fsync covers many papers
+        if len(self._pending) >= INSERT_BATCH_SIZE:
+            self.flush()
+
+    # Insert buffered papers in one transaction and empty the buffer
+    def flush(self):
+        pending = self._pending
+
+        if not pending:
+            return
+
         try:
-            paper_id = insert_paper(self.db_path, paper_data)
-            self.logger.info(f"Inserted {filename} with ID: {paper_id}")
-            self.stats['successful'] += 1
-            return True
-            
+            inserted = insert_papers_bulk(self.db_path, pending, con=self._conn)
+            self.logger.info(f"Inserted {inserted} papers")
+            self.stats['successful'] += inserted
+
         except Exception as e:
-            self.logger.error(f"Database error for {filename}: {str(e)}")
-            self.stats['failed'] += 1
-            self.stats['errors'].append({'file': filename, 'error': str(e)})
-            return False
-        
-    # Database inserts should be wrapped in try/except so errors don't crash the whole pipeline
+            # The transaction rolled back so none of this batch was saved
+            self.logger.error(f"Database error for batch of {len(pending)} papers: {str(e)}")
+            self.stats['failed'] += len(pending)
+            for paper_data in pending:
+                self.stats['errors'].append({'file': paper_data['filename'], 'error': str(e)})
+
+        pending.clear()
 
     #Process all PDF's in data directory
-    def process_all_pdfs(self):
+    def _extract_all(self, pdf_files: list):
+        """
+        Args:
+            pdf_files: List of (DirEntry, stat) tuples to extract
+
+        Yields:
+            (filename, output, error) tuples as files finish - output is the _extract_and_parse tuple,
+            error is the exception when extraction crashed
+        """
+
+        # spawn/forkserver workers start a fresh interpreter that re-imports torch, sentence-transformers and faiss
+        # (seconds per worker) and re-runs the caller's script - extract in this process instead
+        if multiprocessing.get_start_method() != 'fork':
+            for entry, st in pdf_files:
+                try:
+                    yield entry.name, _extract_and_parse(entry.path, st.st_size, st.st_mtime), None
+                except Exception as e:
+                    yield entry.name, None, e
+            return
+
+        # Extraction is CPU bound and every file is independent, so each worker process takes whole files
+        with ProcessPoolExecutor(max_workers=EXTRACT_WORKERS) as pool:
+            futures = {
+                pool.submit(_extract_and_parse, entry.path, st.st_size, st.st_mtime): entry.name
+                for entry, st in pdf_files
+            }
+            # entry.path is directory + filename
+
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+
+    def process_all_pdfs(self, force: bool = False):
         """
             
+            Extracts PDFs in parallel worker processes, inserts into the database one at a time.
             Uses tqdm for progress bar.
             Logs summary statistics at the end.
+
+            Worker processes are only used where they are forked (Linux). With spawn (macOS, Windows) PDFs are
+            extracted one at a time in this process. Scripts calling this should still put the call under
+            if __name__ == '__main__': so any spawned process can import them without re-running it.
+
+            Args:
+                force: Re-process every PDF, even ones already ingested with the same file size
             
             Example:
                 pipeline = PaperPipeline('data/raw', 'data/documents.db')
@@ -660,25 +1691,58 @@ class PaperPipeline:
         from tqdm import tqdm
 
         # Find all PDF files
-        pdf_files = [f for f in os.listdir(self.data_dir) if f.endswith('.pdf')]
+        with os.scandir(self.data_dir) as entries:
+            pdf_files = [(entry, entry.stat()) for entry in entries if entry.name.endswith('.pdf')]
+
+        # os.scandir returns a DirEntry for every file in directory and is filtered to only get files ending in .pdf
+        # Each file is stat'ed once here and that size/mtime is used for skipping and stored with the paper
 
-        # os.listdir returns all files in directory and is filtered to only get files ending in .pdf
+        # Counts are per run - reset them together so the summary adds up on every run
+        self.stats.update(total=len(pdf_files), successful=0, failed=0, skipped=0, errors=[])
 
         # Update logs with found PDFs or error notice
-        self.stats['total'] = len(pdf_files)
         self.logger.info(f"Found {len(pdf_files)} PDF files to process")
 
         if len(pdf_files) == 0:
             self.logger.warning(f"No PDF files found in {self.data_dir}")
             return
+
+        # Skip PDFs that were already ingested successfully and haven't changed (same size and mtime) since
+        # force=True skips nothing
+        if not force:
+            existing = {
+                row['filename']: (row['file_size'], row['mtime'])
+                for row in self._conn.execute("SELECT filename, file_size, mtime FROM documents WHERE status = 'SUCCESS'")
+            }
+
+            pdf_files = [
+                (entry, st) for entry, st in pdf_files
+                if not _unchanged(existing.get(entry.name), st)
+            ]
+            self.stats['skipped'] = self.stats['total'] - len(pdf_files)
+
+            if self.stats['skipped']:
+                self.logger.info(f"Skipping {self.stats['skipped']} already processed PDFs")
         
-        # Process each PDF with progress bar or TQDM
-        for filename in tqdm(pdf_files, desc="Processing PDFs"):
-            full_path = os.path.join(self.data_dir, filename)
-            # os.path.join combines directory + filename
-            
-            self.process_single_pdf(full_path)
-            # tqdm wraps the loop to show progress and desc= sets the description text
+        # Results are queued as they finish - only this process writes to SQLite
+        extracted = self._extract_all(pdf_files)
+
+        for filename, output, error in tqdm(extracted, total=len(pdf_files), desc="Processing PDFs"):
+            if error is not None:
+                # Worker crashed before it could return a result
+                self.logger.error(f"Failed to process {filename}: {str(error)}")
+                self.stats['failed'] += 1
+                self.stats['errors'].append({'file': filename, 'error': str(error)})
+                continue
+
+            paper_data = self._prepare_paper(*output)
+
+            if paper_data is not None:
+                self.queue_paper(paper_data)
+        # tqdm wraps the loop to show progress and desc= sets the description text
+
+        # Save whatever is left in the last partial batch
+        self.flush()
 
         # Log final statistics
         self.logger.info("="*60)
@@ -686,6 +1750,7 @@ class PaperPipeline:
         self.logger.info(f"Total files: {self.stats['total']}")
         self.logger.info(f"Successful: {self.stats['successful']}")
         self.logger.info(f"Failed: {self.stats['failed']}")
+        self.logger.info(f"Skipped: {self.stats['skipped']}")
         
         if self.stats['errors']:
             self.logger.info("Errors encountered:")
@@ -694,12 +1759,18 @@ class PaperPipeline:
         
         self.logger.info("="*60)
 
+    # Close the pipeline's database connection
+    def close(self):
+        # Don't lose anything still buffered
+        self.flush()
+        self._conn.close()
+
     # Get processing stats
     def get_statistics(self) -> dict:
         """
 
         Returns:
-            dict with keys: total, successful, failed, erros
+            dict with keys: total, successful, failed, skipped, erros
 
         Example:
             stats = pipeiline.get_stats()
@@ -708,44 +1779,117 @@ class PaperPipeline:
                 
         """
         return self.stats.copy()
+
+    # Look up one paper on the pipeline's connection
+    def get_paper(self, paper_id: int) -> dict:
+        """
+
+        Returns:
+            paper dict including full_text, or None if the ID doesn't exist
+        """
+        return get_paper_by_id(self.db_path, paper_id, con=self._conn)
     
     # Build RAG index from all papers in database
     def build_rag_index(self):
 
         # Get all papers from db
 
-        # Build vector store
+        # Load saved index if it still matches the db, otherwise add new papers or rebuild
 
-        # Save index to self.faiss_index, self.chunkl_metadata
+        # Save index and chunks to self.chunk_store
 
         self.logger.info("Building RAG index...")
 
-        # Get all papers from db
-        papers = get_all_papers(self.db_path)
+        # Stream just the ID, text location and change markers of each paper from db
+        papers = list(iter_papers(
+            self.db_path, ('id', 'text_path', 'text_length', 'mtime', 'processed_date'), con=self._conn
+        ))
 
         if len(papers) == 0:
             self.logger.warning("No papers in database to index")
             return
-        
-        # Extract tuples of paper_id and full_text
-        paper_texts = [(paper['id'], paper['full_text']) for paper in papers]
+
+        # Paper ID's with text length, PDF mtime and processing time - cheap way to tell if the saved index is stale
+        # A re-processed PDF keeps its ID (upsert) and may keep its text length, but processed_date always moves
+        # Rows from before text_length existed have to read their text to get it
+        fingerprint = {
+            paper_id: (
+                text_length if text_length is not None else len(read_text(self.db_path, text_path)),
+                mtime,
+                processed_date
+            )
+            for paper_id, text_path, text_length, mtime, processed_date in papers
+        }
+
+        try:
+            saved = load_vector_store(self.index_path, self.index_metadata_path)
+        except Exception as e:
+            self.logger.warning(f"Could not load saved RAG index, rebuilding: {str(e)}")
+            saved = None
+
+        if saved is not None:
+            store, saved_fingerprint = saved
+
+            # Nothing changed - reuse the saved index as is
+            if saved_fingerprint == fingerprint:
+                self.chunk_store = store
+                self.logger.info(f"Loaded saved RAG index with {len(self.chunk_store)} chunks")
+                return
+
+            # Only new papers - embed just those and append them
+            only_new = all(fingerprint.get(paper_id) == marker for paper_id, marker in saved_fingerprint.items())
+
+            if only_new and _can_append(store.index):
+                # Only the new papers' text files are decompressed
+                new_texts = [
+                    (paper_id, read_text(self.db_path, text_path))
+                    for paper_id, text_path, *_ in papers if paper_id not in saved_fingerprint
+                ]
+                added = add_to_vector_store(store, new_texts)
+
+                self.chunk_store = store
+                save_vector_store(self.chunk_store, fingerprint, self.index_path, self.index_metadata_path)
+                self.logger.info(f"Added {added} chunks from {len(new_texts)} new papers to saved RAG index")
+                return
+
+            self.logger.info("Saved RAG index is out of date, rebuilding")
+
+        # Full rebuild needs every paper's text
+        paper_texts = [(paper_id, read_text(self.db_path, text_path)) for paper_id, text_path, *_ in papers]
 
         self.logger.info(f"Indexing {len(paper_texts)} papers...")
 
         # Build the vector store
-        self.faiss_index, self.chunk_metadata = build_vector_store(paper_texts)
+        self.chunk_store = build_vector_store(paper_texts)
+
+        save_vector_store(self.chunk_store, fingerprint, self.index_path, self.index_metadata_path)
+
+        self.logger.info(f"RAG index build with {len(self.chunk_store)} chunks")
+
+    # Pre-compute embeddings for questions that are likely to be asked
+    def warmup(self, queries: list):
+        """
+        Args:
+            queries: List of question strings to cache embeddings for
+
+        Example:
+            pipeline.warmup(["How does leptin affect appetite?"])
+        """
+
+        for question in queries:
+            embed_query(question)
 
-        self.logger.info(f"RAG index build with {len(self.chunk_metadata)} chunks")
+        self.logger.info(f"Warmed up query cache with {len(queries)} questions")
 
     # Seach papers using RAG
     def search(self, question: str, top_k: int = 5):
-        if self.faiss_index is None:
+        if self.chunk_store is None:
             self.logger.error("RAG index not build. Call build_rag_index() first")
             return []
         
         self.logger.info(f"Searching for: {question}")
 
-        results = query_rag(question, self.faiss_index, self.chunk_metadata, top_k)
+        results = query_rag(question, self.chunk_store, top_k)
 
         self.logger.info(f"Found {len(results)} results")
 
@@ -5,8 +5,8 @@ from src.pipeline import extract_pdf_text
 # Extract text
 result = extract_pdf_text('data/raw/12889_2020_Article_8969.pdf')
 
-if result['success']:
-    text = result['text']
+if result.success:
+    text = result.text
     
     # Show first 2000 characters
     print("="*60)
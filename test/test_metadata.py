@@ -5,11 +5,11 @@ from src.pipeline import extract_pdf_text, parse_metadata
 # Extract text from a PDF
 result = extract_pdf_text('data/raw/PHY2-5-e13503.pdf')
 
-if result['success']:
+if result.success:
     print("✓ PDF text extracted\n")
     
     # Parse metadata
-    metadata = parse_metadata(result['text'])
+    metadata = parse_metadata(result.text)
     
     print("="*50)
     print("EXTRACTED METADATA:")
@@ -23,4 +23,4 @@ if result['success']:
         print(metadata['abstract'][:200])
         print("...")
 else:
-    print(f"❌ Failed to extract PDF: {result['error']}")
\ No newline at end of file
+    print(f"❌ Failed to extract PDF: {result.error}")
\ No newline at end of file
@@ -0,0 +1,321 @@
+# test_parsing.py
+# Regression checks for metadata parsing, skipping unchanged PDFs, schema migration and saved RAG indexes
+# Needs no PDFs - everything runs in a temporary folder (the index check loads the embedding model)
+
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+import src.pipeline as pipeline
+from src.pipeline import (
+    parse_metadata, create_database, insert_paper, get_paper_by_id,
+    build_vector_store, add_to_vector_store, save_vector_store, load_vector_store, query_rag
+)
+
+
+# The three-pass parse_metadata from before title/authors/abstract were merged into one loop
+def _parse_metadata_reference(full_text: str) -> dict:
+    metadata = {'title': '', 'authors': '', 'abstract': None}
+
+    lines = [line.strip() for line in full_text.split('\n') if line.strip()]
+
+    start_index = 1 if lines and not pipeline.PUBMED_HEADER_WORDS.isdisjoint(lines[0].upper().split()) else 0
+
+    title_lines = []
+    for i in range(start_index, min(start_index + 5, len(lines))):
+        line = lines[i]
+        if any(char.isdigit() for char in line) and ('*' in line or '@' in line):
+            break
+        if line.lower() == 'abstract':
+            break
+        if len(line) > 10:
+            title_lines.append(line)
+
+    metadata['title'] = ' '.join(title_lines) if title_lines else lines[0] if lines else ''
+
+    for i, line in enumerate(lines[:20]):
+        if any(char.isdigit() for char in line) and (',' in line or '*' in line):
+            author_lines = [line]
+            if i + 1 < len(lines) and 'and' in lines[i + 1].lower():
+                author_lines.append(lines[i + 1])
+            metadata['authors'] = ' '.join(author_lines)
+            break
+
+    abstract_index = -1
+    for i, line in enumerate(lines):
+        if line.lower() == 'abstract':
+            abstract_index = i
+            break
+
+    if abstract_index != -1:
+        abstract_lines = []
+        for line in lines[abstract_index + 1:]:
+            if any(header in line.lower() for header in pipeline.SECTION_HEADERS):
+                break
+            if len(line) >= 20:
+                abstract_lines.append(line)
+
+        abstract_text = ' '.join(abstract_lines).strip()
+        if len(abstract_text) > 100:
+            metadata['abstract'] = abstract_text[:3000]
+
+    return metadata
+
+
+# Lines the random papers are built from
+PIECES = [
+    "RESEARCH ARTICLE Open Access", "Open Access", "Research", "Abstract", "abstract", "ABSTRACT", "  Abstract  ",
+    "Background", "Introduction:", "METHODS", "Keywords: a, b", "Correspondence: x@y.z",
+    "John Smith1*, Jane Doe2", "Mary², Bob¹*", "and Bob Lee3", "alpha, beta 3", "résumé ①, test*", "a@b",
+    "A long line of abstract text that is definitely more than twenty characters",
+    "background information line here", "Title of a paper here", "short", "x" * 150, "12 34 56",
+    "", "   ", "\t", " ", "article",
+]
+
+
+def test_line_splitting():
+    samples = ["", "\n\n", "  a  \n\tb\t\n   \nc", "　x　\r\ny", " \n".join(PIECES)]
+
+    for text in samples:
+        assert pipeline._LINE_RE.findall(text) == [line.strip() for line in text.split('\n') if line.strip()]
+
+    print("✓ Line splitting matches split/strip")
+
+
+def test_parse_metadata_matches_reference():
+    rng = random.Random(0)
+
+    for _ in range(3000):
+        lines = [rng.choice(PIECES) + rng.choice(["", " ", "\r", "  x"]) for _ in range(rng.randint(0, 40))]
+        text = '\n'.join(lines)
+
+        assert parse_metadata(text) == _parse_metadata_reference(text), repr(text)
+
+    print("✓ parse_metadata matches the three-pass reference on 3000 random papers")
+
+
+def test_parse_metadata_example():
+    text = '\n'.join([
+        "RESEARCH ARTICLE Open Access",
+        "Leptin and appetite in adults",
+        "John Smith1*, Jane Doe2",
+        "and Bob Lee1",
+        "Abstract",
+        "This abstract line is long enough to be kept as part of the abstract text.",
+        "Another long abstract line that pushes the abstract past one hundred characters.",
+        "Background",
+        "Body text",
+    ])
+
+    metadata = parse_metadata(text)
+
+    assert metadata['title'] == "Leptin and appetite in adults"
+    assert metadata['authors'] == "John Smith1*, Jane Doe2 and Bob Lee1"
+    assert metadata['abstract'].startswith("This abstract line")
+    assert "Body text" not in metadata['abstract']
+
+    print("✓ parse_metadata example paper")
+
+
+def test_long_numeric_lines_are_fast():
+    # PDF tables often come out as one huge line - the author checks must stay linear
+    text = ('1' * 9000 + '\n') * 25
+
+    start = time.perf_counter()
+    parse_metadata(text)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.1, f"parse_metadata took {elapsed:.3f}s on long numeric lines"
+
+    print(f"✓ Long numeric lines parsed in {elapsed * 1000:.1f} ms")
+
+
+def test_skip_unchanged():
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, 'paper.pdf')
+        with open(pdf_path, 'wb') as f:
+            f.write(b'%PDF-1.4 not a real pdf')
+        st = os.stat(pdf_path)
+
+        assert not pipeline._unchanged(None, st)                                  # never processed
+        assert pipeline._unchanged((st.st_size, st.st_mtime), st)                 # same size and mtime
+        assert pipeline._unchanged((st.st_size, None), st)                        # row from before mtime was stored
+        assert not pipeline._unchanged((st.st_size + 1, st.st_mtime), st)         # size changed
+        assert not pipeline._unchanged((st.st_size, st.st_mtime - 10), st)        # touched since
+
+    print("✓ Unchanged PDF detection")
+
+
+def test_upsert_keeps_id():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'documents.db')
+        create_database(db_path)
+
+        paper = {
+            'filename': 'paper.pdf', 'title': 'First', 'authors': '', 'abstract': None,
+            'full_text': 'first text', 'page_count': 1, 'file_size': 10, 'mtime': 1.0, 'status': 'SUCCESS'
+        }
+        first_id = insert_paper(db_path, paper)
+
+        # Re-processing the same PDF updates its row, even through a plain default-mode connection
+        con = sqlite3.connect(db_path)
+        second_id = insert_paper(db_path, dict(paper, title='Second', full_text='second text'), con=con)
+        con.close()
+
+        assert first_id == second_id
+
+        saved = get_paper_by_id(db_path, first_id)
+        assert saved['title'] == 'Second'
+        assert saved['full_text'] == 'second text'
+        assert saved['text_length'] == len('second text')
+
+    print("✓ Re-inserting a PDF updates its row and keeps its ID")
+
+
+def test_failed_upsert_keeps_old_text():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'documents.db')
+        create_database(db_path)
+
+        paper = {
+            'filename': 'paper.pdf', 'title': '', 'authors': '', 'abstract': None,
+            'full_text': 'old text', 'page_count': 1, 'file_size': 10, 'mtime': 1.0, 'status': 'SUCCESS'
+        }
+        paper_id = insert_paper(db_path, paper)
+
+        # Make the next upsert roll back
+        con = sqlite3.connect(db_path)
+        con.execute("CREATE TRIGGER fail_update BEFORE UPDATE ON documents BEGIN SELECT RAISE(ABORT, 'fail'); END")
+        con.commit()
+        con.close()
+
+        try:
+            insert_paper(db_path, dict(paper, full_text='new text that never committed'))
+            assert False, "upsert should have failed"
+        except sqlite3.IntegrityError:
+            pass
+
+        saved = get_paper_by_id(db_path, paper_id)
+        assert saved['full_text'] == 'old text'
+        assert saved['text_length'] == len('old text')
+        assert not [name for name in os.listdir(pipeline._text_dir(db_path)) if name.endswith('.tmp')]
+
+    print("✓ A rolled back upsert leaves the old text in place")
+
+
+def test_databases_in_one_folder_keep_separate_texts():
+    with tempfile.TemporaryDirectory() as tmp:
+        paper = {
+            'filename': 'paper.pdf', 'title': '', 'authors': '', 'abstract': None,
+            'page_count': 1, 'file_size': 10, 'mtime': 1.0, 'status': 'SUCCESS'
+        }
+
+        ids = {}
+        for name in ('documents', 'test'):
+            db_path = os.path.join(tmp, f'{name}.db')
+            create_database(db_path)
+            ids[name] = insert_paper(db_path, dict(paper, full_text=f'{name} text'))
+
+        for name, paper_id in ids.items():
+            assert get_paper_by_id(os.path.join(tmp, f'{name}.db'), paper_id)['full_text'] == f'{name} text'
+
+    print("✓ Two databases in one folder keep their own text files")
+
+
+def test_migrates_full_text_schema():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'documents.db')
+
+        # The original schema kept the text in the table
+        con = sqlite3.connect(db_path)
+        con.execute('''CREATE TABLE documents (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, filename TEXT NOT NULL, title TEXT, authors TEXT,
+                    abstract TEXT, full_text TEXT, page_count INTEGER, file_size INTEGER,
+                    processed_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP, status TEXT)''')
+        con.executemany(
+            "INSERT INTO documents (filename, full_text, status) VALUES (?, ?, 'SUCCESS')",
+            [('a.pdf', 'old a'), ('b.pdf', 'text b'), ('a.pdf', 'new a')]
+        )
+        con.commit()
+        con.close()
+
+        create_database(db_path)
+
+        con = sqlite3.connect(db_path)
+        rows = con.execute("SELECT id, filename, text_length FROM documents ORDER BY id").fetchall()
+        con.close()
+
+        # Newest row per filename is kept and its text is readable from disk
+        assert rows == [(2, 'b.pdf', len('text b')), (3, 'a.pdf', len('new a'))]
+        assert get_paper_by_id(db_path, 3)['full_text'] == 'new a'
+
+    print("✓ Databases with a full_text column are migrated")
+
+
+def test_saved_index_round_trip():
+    paper_texts = [
+        (1, "Leptin is a hormone that regulates appetite and energy balance. " * 30),
+        (2, "Testosterone therapy changes muscle mass and cardiovascular risk. " * 30),
+        (3, "Physical fitness improves long term health outcomes in adults. " * 30),
+    ]
+
+    store = build_vector_store(paper_texts)
+    before = query_rag("How does leptin affect appetite?", store, top_k=3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, 'index.faiss')
+        metadata_path = os.path.join(tmp, 'index.pkl')
+        fingerprint = {paper_id: (len(text), None, None) for paper_id, text in paper_texts}
+
+        save_vector_store(store, fingerprint, index_path, metadata_path)
+        loaded, loaded_fingerprint = load_vector_store(index_path, metadata_path)
+
+    after = query_rag("How does leptin affect appetite?", loaded, top_k=3)
+
+    assert loaded_fingerprint == fingerprint
+    assert len(loaded) == len(store)
+    assert [(r['paper_id'], r['chunk_index']) for r in after] == [(r['paper_id'], r['chunk_index']) for r in before]
+    assert before[0]['paper_id'] == 1
+
+    # Best match first - score is cosine similarity, distance is 1 - score
+    assert [r['score'] for r in before] == sorted((r['score'] for r in before), reverse=True)
+    assert all(abs(r['distance'] - (1.0 - r['score'])) < 1e-6 for r in before)
+
+    print("✓ Saved RAG index loads and answers the same")
+
+
+def test_added_paper_on_new_topic_is_found():
+    store = build_vector_store([
+        (1, "Leptin is a hormone that regulates appetite and energy balance. " * 30),
+        (2, "Testosterone therapy changes muscle mass and cardiovascular risk. " * 30),
+    ])
+
+    first_new = len(store)
+    add_to_vector_store(store, [(3, "Sleep deprivation disrupts the circadian clock and melatonin release. " * 30)])
+
+    # Appended vectors must survive quantization instead of being clipped to the first build's range
+    reconstructed = store.index.reconstruct_n(first_new, len(store) - first_new)
+    assert np.allclose(np.linalg.norm(reconstructed, axis=1), 1.0, atol=0.05)
+
+    results = query_rag("Sleep deprivation and the circadian clock", store, top_k=3)
+    assert results[0]['paper_id'] == 3
+
+    print("✓ Paper added to an existing index is found")
+
+
+if __name__ == '__main__':
+    test_line_splitting()
+    test_parse_metadata_matches_reference()
+    test_parse_metadata_example()
+    test_long_numeric_lines_are_fast()
+    test_skip_unchanged()
+    test_upsert_keeps_id()
+    test_failed_upsert_keeps_old_text()
+    test_databases_in_one_folder_keep_separate_texts()
+    test_migrates_full_text_schema()
+    test_saved_index_round_trip()
+    test_added_paper_on_new_topic_is_found()
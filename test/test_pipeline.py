@@ -2,24 +2,33 @@
 
 from src.pipeline import PaperPipeline
 
-# Initialize pipeline
-pipeline = PaperPipeline(
-    data_dir='data/raw',
-    db_path='data/documents.db',
-    log_file='logs/pipeline.log'
-)
+# Guarded so PDF worker processes can import this file without re-running it
+if __name__ == '__main__':
+    # Initialize pipeline
+    pipeline = PaperPipeline(
+        data_dir='data/raw',
+        db_path='data/documents.db',
+        log_file='logs/pipeline.log'
+    )
 
-# Process all PDFs
-pipeline.process_all_pdfs()
+    # Process all PDFs
+    pipeline.process_all_pdfs()
 
-# Get statistics
-stats = pipeline.get_statistics()
+    # Get statistics
+    stats = pipeline.get_statistics()
 
-print("\n" + "="*60)
-print("FINAL STATISTICS")
-print("="*60)
-print(f"Total PDFs: {stats['total']}")
-print(f"Successful: {stats['successful']}")
-print(f"Failed: {stats['failed']}")
-print(f"Success rate: {stats['successful']/stats['total']*100:.1f}%")
-print("="*60)
\ No newline at end of file
+    print("\n" + "="*60)
+    print("FINAL STATISTICS")
+    print("="*60)
+    print(f"Total PDFs: {stats['total']}")
+    print(f"Successful: {stats['successful']}")
+    print(f"Failed: {stats['failed']}")
+    print(f"Skipped: {stats['skipped']}")
+
+    # Skipped PDFs weren't attempted this run
+    attempted = stats['total'] - stats['skipped']
+    if attempted:
+        print(f"Success rate: {stats['successful']/attempted*100:.1f}%")
+    else:
+        print("Success rate: n/a (nothing new to process)")
+    print("="*60)
\ No newline at end of file